@@ -8,6 +8,7 @@ import json
 import os
 import threading
 import time
+from collections import deque
 from pathlib import Path
 from typing import Any, Callable
 
@@ -95,8 +96,8 @@ class Agent:
         self.before_turn = before_turn
         self.get_api_key = get_api_key
         self._queue_lock = threading.Lock()
-        self._steering_queue: list[str] = []
-        self._follow_up_queue: list[str] = []
+        self._steering_queue: deque[str] = deque()
+        self._follow_up_queue: deque[str] = deque()
 
         default_sessions_dir = Path(__file__).resolve().parents[1] / "sessions"
         self.store = SessionStore(sessions_dir=sessions_dir or str(default_sessions_dir))
@@ -145,12 +146,12 @@ class Agent:
 
     def _chat_impl(self, user_input: str) -> str:
         self.session.add_user_message(user_input)
-        self.store.save(self.session)
+        self.store.save_pending(self.session)
         return self._run_loop()
 
     def _chat_stream_impl(self, user_input: str, on_text_delta: Callable[[str], None]) -> str:
         self.session.add_user_message(user_input)
-        self.store.save(self.session)
+        self.store.save_pending(self.session)
         return self._run_loop(on_text_delta=on_text_delta)
 
     def _continue_impl(self, on_text_delta: Callable[[str], None] | None = None) -> str:
@@ -194,9 +195,31 @@ class Agent:
             self._follow_up_queue.clear()
 
     def _run_loop(self, on_text_delta: Callable[[str], None] | None = None) -> str:
+        try:
+            return self._run_rounds(on_text_delta)
+        finally:
+            # Steps persist via save_pending() appends; one full save per run refreshes the header
+            # (usage counters, updated_at) and drops rows pruned from memory.
+            self.store.save(self.session)
+
+    def _run_rounds(self, on_text_delta: Callable[[str], None] | None) -> str:
         self._emit_event({"type": "agent_start"})
         last_tool_signature = ""
         repeat_rounds = 0
+        # Prompt and tool schemas depend only on agent configuration, so build them once per run.
+        base_system_prompt = self.prompt_builder.build(
+            provider=self.provider_name,
+            model=self.model,
+            workspace_dir=self.workspace_dir,
+            tool_summaries=get_tool_summaries(
+                include_orchestration=self.enable_orchestration,
+                extra_tools=self.extra_tools,
+            ),
+        )
+        tool_definitions = get_tool_definitions(
+            include_orchestration=self.enable_orchestration,
+            extra_tools=self.extra_tools,
+        )
         for _round in range(MAX_TOOL_ROUNDS):
             round_no = _round + 1
             assistant_preview = ""
@@ -214,15 +237,7 @@ class Agent:
                     }
                 )
                 return self._finish_run("(agent stopped: cancelled)")
-            system_prompt = self.prompt_builder.build(
-                provider=self.provider_name,
-                model=self.model,
-                workspace_dir=self.workspace_dir,
-                tool_summaries=get_tool_summaries(
-                    include_orchestration=self.enable_orchestration,
-                    extra_tools=self.extra_tools,
-                ),
-            )
+            system_prompt = base_system_prompt
             base_history_messages = self.session.get_history_messages()
             history_messages = base_history_messages
             if self.transform_context is not None:
@@ -272,10 +287,6 @@ class Agent:
                 if isinstance(transformed, list):
                     llm_messages = transformed
 
-            tool_definitions = get_tool_definitions(
-                include_orchestration=self.enable_orchestration,
-                extra_tools=self.extra_tools,
-            )
             self._emit_event({"type": "message_start", "role": "assistant", "round": round_no})
 
             def _forward_delta(delta: str) -> None:
@@ -311,7 +322,7 @@ class Agent:
                     cache_read_tokens=int(response.usage.get("cache_read_tokens", 0) or 0),
                     cache_write_tokens=int(response.usage.get("cache_write_tokens", 0) or 0),
                 )
-            self.store.save(self.session)
+            self.store.save_pending(self.session)
 
             if not response.tool_calls:
                 queued_follow_up = self._pop_follow_up_message()
@@ -450,7 +461,7 @@ class Agent:
                     self._append_queued_user_message(queued_steer, source="steer", round_no=round_no)
                     steering_triggered = True
                     break
-            self.store.save(self.session)
+            self.store.save_pending(self.session)
             status = "steered" if steering_triggered else "tool_calls_processed"
             self._emit_event(
                 {
@@ -550,18 +561,18 @@ class Agent:
         with self._queue_lock:
             if not self._steering_queue:
                 return None
-            return self._steering_queue.pop(0)
+            return self._steering_queue.popleft()
 
     def _pop_follow_up_message(self) -> str | None:
         with self._queue_lock:
             if not self._follow_up_queue:
                 return None
-            return self._follow_up_queue.pop(0)
+            return self._follow_up_queue.popleft()
 
     def _append_queued_user_message(self, content: str, *, source: str, round_no: int) -> None:
         self._emit_event({"type": "message_start", "role": "user", "source": source, "round": round_no})
         self.session.add_user_message(content)
-        self.store.save(self.session)
+        self.store.save_pending(self.session)
         self._emit_event(
             {
                 "type": "message_end",
@@ -621,7 +632,7 @@ class Agent:
             self.session.add_system_event(
                 f"Lane wait detected: waited={wait_ms:.0f}ms run={run_ms:.0f}ms session={self.session.meta.session_id}"
             )
-            self.store.save(self.session)
+            self.store.save_pending(self.session)
 
     def _tool_sessions_spawn(
         self,
@@ -660,7 +671,7 @@ class Agent:
         self.session.add_system_event(
             f"Spawned subagent run={run.run_id} child_session={run.child_session_id} depth={self.session.meta.subagent_depth + 1}"
         )
-        self.store.save(self.session)
+        self.store.save_pending(self.session)
         if run_now:
             if background:
                 self._start_subagent_background(run.run_id, run.child_session_id, run.provider, run.model, task)
@@ -681,7 +692,7 @@ class Agent:
                 self.subagent_registry.set_completed(run.run_id, reply=first_reply)
                 payload["first_reply"] = _truncate(first_reply, 1200)
                 self.session.add_system_event(f"Subagent run={run.run_id} completed initial task.")
-                self.store.save(self.session)
+                self.store.save_pending(self.session)
         return json.dumps(payload, ensure_ascii=False)
 
     def _tool_subagents(
@@ -757,7 +768,7 @@ class Agent:
             _GLOBAL_SUBAGENT_RUNTIME.cancel(run_id)
             updated = self.subagent_registry.set_killed(run_id)
             self.session.add_system_event(f"Subagent run={run_id} marked as killed.")
-            self.store.save(self.session)
+            self.store.save_pending(self.session)
             return json.dumps(
                 {"status": "ok", "run_id": run_id, "new_status": updated.status if updated else "killed"},
                 ensure_ascii=False,
@@ -779,7 +790,7 @@ class Agent:
                     task=message.strip(),
                 )
                 self.session.add_system_event(f"Subagent run={run_id} steered in background.")
-                self.store.save(self.session)
+                self.store.save_pending(self.session)
                 return json.dumps({"status": "ok", "run_id": run_id, "dispatched": "background"}, ensure_ascii=False)
             child = Agent(
                 provider=run.provider,
@@ -795,7 +806,7 @@ class Agent:
             reply = child.chat(message.strip())
             self.subagent_registry.set_completed(run_id, reply=reply)
             self.session.add_system_event(f"Subagent run={run_id} steered with a new message.")
-            self.store.save(self.session)
+            self.store.save_pending(self.session)
             return json.dumps({"status": "ok", "run_id": run_id, "reply": _truncate(reply, 2400)}, ensure_ascii=False)
 
         return json.dumps({"status": "error", "error": f"unknown action: {action}"}, ensure_ascii=False)
@@ -833,9 +844,12 @@ class Agent:
                     raise
                 sleep_s = base_delay_s * (2**attempt)
                 print(f"  [retry] transient model error, retrying in {sleep_s:.1f}s")
-                if self.cancel_event is not None and self.cancel_event.is_set():
-                    raise RuntimeError("cancelled")
-                time.sleep(sleep_s)
+                if self.cancel_event is not None:
+                    # Wait on the event so cancellation interrupts the backoff immediately.
+                    if self.cancel_event.wait(sleep_s):
+                        raise RuntimeError("cancelled")
+                else:
+                    time.sleep(sleep_s)
                 attempt += 1
 
     def _is_transient_error(self, exc: Exception) -> bool:
@@ -934,7 +948,7 @@ class Agent:
             subagent_depth=self.subagent_depth,
         )
         parent.add_system_event(message)
-        self.store.save(parent)
+        self.store.save_pending(parent)
 
     def _append_parent_completion_reply(self, run_id: str, reply: str) -> None:
         """Append a human-readable assistant summary to the parent session when a subagent completes."""
@@ -950,7 +964,7 @@ class Agent:
             subagent_depth=self.subagent_depth,
         )
         parent.add_assistant_message({"role": "assistant", "content": content})
-        self.store.save(parent)
+        self.store.save_pending(parent)
 
 
 def _truncate(text: str, max_len: int) -> str:
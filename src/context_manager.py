@@ -114,16 +114,26 @@ class ContextManager:
         if len(working) > self.keep_last_messages:
             working = working[-self.keep_last_messages :]
 
-        while self._total_measure(working) > cap and len(working) > 4:
-            del working[0]
+        # Drop oldest messages with a running total instead of re-measuring the list per deletion.
+        sizes = [self._measure(msg) for msg in working]
+        remaining = sum(sizes)
+        drop = 0
+        while remaining > cap and len(working) - drop > 4:
+            remaining -= sizes[drop]
+            drop += 1
+        if drop:
+            working = working[drop:]
 
         with_system = [{"role": "system", "content": system_prompt}, *working]
         return with_system, compacted
 
     def _total_measure(self, messages: list[dict[str, Any]]) -> int:
+        return sum(self._measure(msg) for msg in messages)
+
+    def _measure(self, message: dict[str, Any]) -> int:
         if self._mode == "tokens":
-            return sum(_message_tokens(msg) for msg in messages)
-        return sum(_message_text_size(msg) for msg in messages)
+            return _message_tokens(message)
+        return _message_text_size(message)
 
     def _compact(self, messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
         head = messages[: max(0, len(messages) - self.compact_keep_tail)]
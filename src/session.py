@@ -10,16 +10,31 @@ System prompt is built dynamically and injected at request time.
 
 from __future__ import annotations
 
+import json
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from itertools import islice
 from typing import Any
 
+# Upper bound on the serialized size of Session.entries; oldest entries are pruned past it.
+DEFAULT_MAX_TOTAL_BYTES = 8 * 1024 * 1024
+
 
 def utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-@dataclass
+# Same compact layout SessionStore writes; one shared instance instead of one per json.dumps call.
+_SIZE_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _entry_bytes(entry: dict[str, Any]) -> int:
+    text = _SIZE_ENCODER.encode(entry)
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+@dataclass(slots=True)
 class SessionMeta:
     session_id: str
     provider: str
@@ -37,7 +52,14 @@ class SessionMeta:
 
 
 class Session:
-    """In-memory conversation session (metadata + messages)."""
+    """
+    In-memory conversation session (metadata + messages).
+
+    max_total_bytes caps the serialized size of entries; None disables it. The cap is enforced
+    only when an entry is appended: history passed to the constructor (e.g. loaded from disk) or
+    to replace_history_messages() is kept as is until the next append. Entries pruned from memory
+    are also removed from disk by the next full SessionStore.save().
+    """
 
     def __init__(
         self,
@@ -45,12 +67,20 @@ class Session:
         meta: SessionMeta,
         messages: list[dict[str, Any]] | None = None,
         entries: list[dict[str, Any]] | None = None,
+        max_total_bytes: int | None = DEFAULT_MAX_TOTAL_BYTES,
+        total_bytes: int | None = None,
     ) -> None:
         self.meta = meta
+        self.max_total_bytes = max_total_bytes
+        # Serialized size of entries; None until first needed (callers that read entries from a
+        # file can pass the byte count they already have via total_bytes).
+        self._total_bytes: int | None = total_bytes
+        # Index of the first entry not yet persisted; None means the file must be fully rewritten.
+        self._unsaved_start: int | None = None
         if entries is not None:
-            self.entries: list[dict[str, Any]] = entries[:]
+            self.entries: deque[dict[str, Any]] = deque(entries)
         else:
-            self.entries = []
+            self.entries = deque()
             for msg in messages[:] if messages else []:
                 self.entries.append(
                     {
@@ -72,28 +102,30 @@ class Session:
     # -- append helpers --------------------------------------------------------
 
     def add_user_message(self, content: str) -> None:
-        self.entries.append(
+        self._append_entry(
             {
                 "type": "message",
                 "message": {"role": "user", "content": content},
                 "timestamp": utc_now_iso(),
             }
         )
-        self.touch()
 
-    def add_assistant_message(self, message: dict[str, Any]) -> None:
-        """Append the raw assistant message dict (may contain tool_calls)."""
-        self.entries.append(
+    def add_message(self, message: dict[str, Any]) -> None:
+        """Append a canonical chat message dict of any role."""
+        self._append_entry(
             {
                 "type": "message",
                 "message": message,
                 "timestamp": utc_now_iso(),
             }
         )
-        self.touch()
+
+    def add_assistant_message(self, message: dict[str, Any]) -> None:
+        """Append the raw assistant message dict (may contain tool_calls)."""
+        self.add_message(message)
 
     def add_tool_result(self, tool_call_id: str, content: str) -> None:
-        self.entries.append(
+        self._append_entry(
             {
                 "type": "message",
                 "message": {
@@ -104,20 +136,18 @@ class Session:
                 "timestamp": utc_now_iso(),
             }
         )
-        self.touch()
 
     def add_system_event(self, content: str) -> None:
-        self.entries.append(
+        self._append_entry(
             {
                 "type": "message",
                 "message": {"role": "assistant", "content": f"[System Message] {content}"},
                 "timestamp": utc_now_iso(),
             }
         )
-        self.touch()
 
     def add_custom_entry(self, custom_type: str, data: Any) -> None:
-        self.entries.append(
+        self._append_entry(
             {
                 "type": "custom",
                 "custom_type": custom_type,
@@ -125,7 +155,6 @@ class Session:
                 "timestamp": utc_now_iso(),
             }
         )
-        self.touch()
 
     def add_custom_message(
         self,
@@ -146,8 +175,7 @@ class Session:
         }
         if details is not None:
             row["details"] = details
-        self.entries.append(row)
-        self.touch()
+        self._append_entry(row)
 
     def add_compaction_entry(self, summary: str, details: Any | None = None) -> None:
         row: dict[str, Any] = {
@@ -157,8 +185,7 @@ class Session:
         }
         if details is not None:
             row["details"] = details
-        self.entries.append(row)
-        self.touch()
+        self._append_entry(row)
 
     def get_history_messages(self) -> list[dict[str, Any]]:
         out: list[dict[str, Any]] = []
@@ -195,7 +222,9 @@ class Session:
             for msg in history_messages
             if isinstance(msg, dict)
         ]
-        self.entries = replaced
+        self.entries = deque(replaced)
+        self._unsaved_start = None
+        self._total_bytes = None
         self.touch()
 
     def accumulate_usage(
@@ -214,16 +243,97 @@ class Session:
         self.meta.usage_cache_write_tokens += max(0, int(cache_write_tokens))
         self.touch()
 
+    # -- persistence bookkeeping -----------------------------------------------
+
+    @property
+    def pending_start(self) -> int | None:
+        """Index of the first entry not yet persisted; None when the file must be fully rewritten."""
+        return self._unsaved_start
+
+    def mark_saved(self) -> None:
+        """Record that every current entry has been persisted."""
+        self._unsaved_start = len(self.entries)
+
     # -- utilities -------------------------------------------------------------
 
     def reset(self) -> None:
         """Clear all non-system conversation messages."""
-        self.entries = []
+        self.entries = deque()
+        self._total_bytes = 0
+        self._unsaved_start = None
         self.touch()
 
     def touch(self) -> None:
         self.meta.updated_at = utc_now_iso()
 
+    def _append_entry(self, row: dict[str, Any]) -> None:
+        self.entries.append(row)
+        if self.max_total_bytes is None:
+            # Untracked while uncapped; recounted if a cap is set later.
+            self._total_bytes = None
+        elif self._total_bytes is None:
+            self._recount_bytes()
+        else:
+            self._total_bytes += _entry_bytes(row)
+        self._prune()
+        self.touch()
+
+    def _recount_bytes(self) -> None:
+        self._total_bytes = sum(_entry_bytes(row) for row in self.entries)
+
+    def _prune(self) -> None:
+        """
+        Drop oldest entries while over max_total_bytes. An assistant tool_calls message and its
+        tool results are dropped together (providers reject orphaned tool results), and the group
+        holding the newest entry is always kept, even if it alone exceeds the cap.
+        """
+        cap = self.max_total_bytes
+        if cap is None or self._total_bytes is None or self._total_bytes <= cap:
+            return
+        entries = self.entries
+        dropped = 0
+        while self._total_bytes > cap:
+            group = self._head_group_len()
+            if group >= len(entries):
+                break
+            for _ in range(group):
+                self._total_bytes -= _entry_bytes(entries.popleft())
+            dropped += group
+        if self._unsaved_start is not None:
+            # Dropped rows stay in the file until the next full save(); appending the tail is still valid.
+            self._unsaved_start = max(0, self._unsaved_start - dropped)
+
+    def _head_group_len(self) -> int:
+        """
+        Number of leading entries that must be dropped together: an assistant tool_calls message
+        plus everything up to its last matching tool result (system events can sit in between).
+        """
+        entries = self.entries
+        head = entries[0]
+        message = head.get("message")
+        if head.get("type") != "message" or not isinstance(message, dict) or not message.get("tool_calls"):
+            # Plain entries, and stray tool results left over from older files, go one at a time.
+            return 1
+        pending = {call.get("id") for call in message["tool_calls"] if isinstance(call, dict)}
+        size = 1
+        for index, row in enumerate(islice(entries, 1, None), start=1):
+            if not pending:
+                break
+            row_message = row.get("message")
+            if row.get("type") != "message" or not isinstance(row_message, dict):
+                continue
+            if row_message.get("role") == "user":
+                break
+            if row_message.get("role") == "tool" and row_message.get("tool_call_id") in pending:
+                pending.discard(row_message.get("tool_call_id"))
+                size = index + 1
+        return size
+
+    @staticmethod
+    def _is_tool_result(row: dict[str, Any]) -> bool:
+        message = row.get("message")
+        return row.get("type") == "message" and isinstance(message, dict) and message.get("role") == "tool"
+
     def __len__(self) -> int:
         return len(self.get_history_messages())
 
@@ -1,11 +1,42 @@
 from __future__ import annotations
 
 import json
+import os
+import secrets
+from itertools import islice
 from pathlib import Path
-from uuid import uuid4
+from typing import Any, Iterable, Iterator
 
 from .session import Session, SessionMeta, utc_now_iso
 
+# Shared compact encoder: one instance per process instead of one per json.dumps call.
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_entries(entries: Iterable[Any]) -> list[str]:
+    lines: list[str] = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        kind = entry.get("type")
+        if kind not in {"message", "custom", "custom_message", "compaction"}:
+            continue
+        lines.append(_JSON_ENCODER.encode(entry))
+    return lines
+
+
+def _iter_rows(lines: Iterable[bytes]) -> Iterator[tuple[dict[str, Any], int]]:
+    """Decode JSONL rows one line at a time, skipping blank and malformed lines; yields (row, line bytes)."""
+    for raw_line in lines:
+        if not raw_line.strip():
+            continue
+        try:
+            row = json.loads(raw_line.decode("utf-8"))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if isinstance(row, dict):
+            yield row, len(raw_line.rstrip(b"\r\n"))
+
 
 class SessionStore:
     def __init__(self, *, sessions_dir: str) -> None:
@@ -13,7 +44,7 @@ class SessionStore:
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
 
     def resolve_session_id(self, requested: str | None) -> str:
-        return requested.strip() if requested and requested.strip() else uuid4().hex[:12]
+        return requested.strip() if requested and requested.strip() else secrets.token_hex(6)
 
     def load_or_create(
         self,
@@ -44,45 +75,43 @@ class SessionStore:
 
         meta: SessionMeta | None = None
         entries: list[dict] = []
-        for raw_line in path.read_text(encoding="utf-8").splitlines():
-            if not raw_line.strip():
-                continue
-            try:
-                row = json.loads(raw_line)
-            except json.JSONDecodeError:
-                continue
-            kind = row.get("type")
-            if kind == "header":
-                meta = SessionMeta(
-                    session_id=str(row.get("session_id", session_id)),
-                    provider=str(row.get("provider", provider)),
-                    model=str(row.get("model", model)),
-                    workspace_dir=str(row.get("workspace_dir", workspace_dir)),
-                    parent_session_id=(
-                        str(row.get("parent_session_id")) if row.get("parent_session_id") is not None else None
-                    ),
-                    subagent_depth=int(row.get("subagent_depth", subagent_depth)),
-                    created_at=str(row.get("created_at", utc_now_iso())),
-                    updated_at=str(row.get("updated_at", utc_now_iso())),
-                    usage_input_tokens=int(row.get("usage_input_tokens", 0) or 0),
-                    usage_output_tokens=int(row.get("usage_output_tokens", 0) or 0),
-                    usage_total_tokens=int(row.get("usage_total_tokens", 0) or 0),
-                    usage_cache_read_tokens=int(row.get("usage_cache_read_tokens", 0) or 0),
-                    usage_cache_write_tokens=int(row.get("usage_cache_write_tokens", 0) or 0),
-                )
-            elif kind == "message":
-                message = row.get("message")
-                if isinstance(message, dict):
-                    entries.append(
-                        {
-                            "type": "message",
-                            "message": message,
-                            "timestamp": str(row.get("timestamp", utc_now_iso())),
-                        }
+        # Size of the kept rows as stored, so Session need not re-encode them to track its cap.
+        entries_bytes = 0
+        with path.open("rb") as fh:
+            for row, size in _iter_rows(fh):
+                kind = row.get("type")
+                if kind == "header":
+                    meta = SessionMeta(
+                        session_id=str(row.get("session_id", session_id)),
+                        provider=str(row.get("provider", provider)),
+                        model=str(row.get("model", model)),
+                        workspace_dir=str(row.get("workspace_dir", workspace_dir)),
+                        parent_session_id=(
+                            str(row.get("parent_session_id")) if row.get("parent_session_id") is not None else None
+                        ),
+                        subagent_depth=int(row.get("subagent_depth", subagent_depth)),
+                        created_at=str(row.get("created_at", utc_now_iso())),
+                        updated_at=str(row.get("updated_at", utc_now_iso())),
+                        usage_input_tokens=int(row.get("usage_input_tokens", 0) or 0),
+                        usage_output_tokens=int(row.get("usage_output_tokens", 0) or 0),
+                        usage_total_tokens=int(row.get("usage_total_tokens", 0) or 0),
+                        usage_cache_read_tokens=int(row.get("usage_cache_read_tokens", 0) or 0),
+                        usage_cache_write_tokens=int(row.get("usage_cache_write_tokens", 0) or 0),
                     )
-            elif kind in {"custom", "custom_message", "compaction"}:
-                if isinstance(row, dict):
+                elif kind == "message":
+                    message = row.get("message")
+                    if isinstance(message, dict):
+                        entries.append(
+                            {
+                                "type": "message",
+                                "message": message,
+                                "timestamp": str(row.get("timestamp", utc_now_iso())),
+                            }
+                        )
+                        entries_bytes += size
+                elif kind in {"custom", "custom_message", "compaction"}:
                     entries.append(row)
+                    entries_bytes += size
 
         if meta is None:
             now = utc_now_iso()
@@ -105,14 +134,14 @@ class SessionStore:
             meta.subagent_depth = max(0, int(meta.subagent_depth))
             meta.updated_at = utc_now_iso()
 
-        session = Session(meta=meta, entries=entries)
+        session = Session(meta=meta, entries=entries, total_bytes=entries_bytes)
         self.save(session)
         return session
 
     def save(self, session: Session) -> None:
         path = self._session_path(session.meta.session_id)
         lines = [
-            json.dumps(
+            _JSON_ENCODER.encode(
                 {
                     "type": "header",
                     "session_id": session.meta.session_id,
@@ -128,18 +157,52 @@ class SessionStore:
                     "usage_total_tokens": session.meta.usage_total_tokens,
                     "usage_cache_read_tokens": session.meta.usage_cache_read_tokens,
                     "usage_cache_write_tokens": session.meta.usage_cache_write_tokens,
-                },
-                ensure_ascii=False,
+                }
             )
         ]
-        for entry in session.entries:
-            if not isinstance(entry, dict):
-                continue
-            kind = entry.get("type")
-            if kind not in {"message", "custom", "custom_message", "compaction"}:
-                continue
-            lines.append(json.dumps(entry, ensure_ascii=False))
-        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        lines.extend(_encode_entries(session.entries))
+        self._write_lines(path, lines, append=False)
+        session.mark_saved()
+
+    def save_pending(self, session: Session) -> None:
+        """
+        Append every entry added since the last save in one write with a single fsync.
+        Falls back to a full save() when the file is missing or the history was rewritten
+        (reset / replace). The header is refreshed on the next full save().
+        """
+        start = session.pending_start
+        path = self._session_path(session.meta.session_id)
+        if start is None or not path.is_file():
+            self.save(session)
+            return
+        lines = _encode_entries(islice(session.entries, start, None))
+        if lines:
+            self._append_lines(path, lines)
+        session.mark_saved()
+
+    def append_message(self, session: Session, message: dict[str, Any]) -> None:
+        """
+        Add a chat message to the session and append only the unsaved records to the session file.
+        Cost is independent of history length; see save_pending().
+        """
+        session.add_message(message)
+        self.save_pending(session)
+
+    def _append_lines(self, path: Path, lines: list[str]) -> None:
+        self._write_lines(path, lines, append=True)
+
+    def _write_lines(self, path: Path, lines: list[str], *, append: bool) -> None:
+        """Write JSONL lines with one encode and a single fsync before returning."""
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if append else os.O_TRUNC)
+        fd = os.open(path, flags, 0o600)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view) :]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
     def _session_path(self, session_id: str) -> Path:
         safe = "".join(ch for ch in session_id if ch.isalnum() or ch in ("-", "_")).strip()
@@ -9,16 +9,20 @@ Each tool has:
 
 from __future__ import annotations
 
+import errno
 import inspect
 import json
 import os
 import re
+import shutil
 import subprocess
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Iterable, Iterator
 from urllib.error import HTTPError, URLError
 from urllib.parse import urlparse
 from urllib.request import Request, urlopen
+from weakref import WeakKeyDictionary
 
 # ---------------------------------------------------------------------------
 # Tool registry
@@ -91,6 +95,28 @@ ORCHESTRATION_TOOL_DEFINITIONS: list[dict[str, Any]] = [
 ]
 
 
+@lru_cache(maxsize=2)
+def _builtin_tool_definitions(include_orchestration: bool) -> tuple[dict[str, Any], ...]:
+    """Snapshot of the built-in schemas; cleared by _register()."""
+    if include_orchestration:
+        return (*BASE_TOOL_DEFINITIONS, *ORCHESTRATION_TOOL_DEFINITIONS)
+    return tuple(BASE_TOOL_DEFINITIONS)
+
+
+@lru_cache(maxsize=2)
+def _builtin_tool_summaries(include_orchestration: bool) -> tuple[tuple[str, str], ...]:
+    return tuple(_summarize(_builtin_tool_definitions(include_orchestration)))
+
+
+def _summarize(tools: Iterable[dict[str, Any]]) -> Iterator[tuple[str, str]]:
+    for tool in tools:
+        fn = tool.get("function", {})
+        name = fn.get("name")
+        description = fn.get("description")
+        if isinstance(name, str) and isinstance(description, str):
+            yield (name, description)
+
+
 def _register(
     name: str,
     description: str,
@@ -109,6 +135,8 @@ def _register(
             },
         }
     )
+    _builtin_tool_definitions.cache_clear()
+    _builtin_tool_summaries.cache_clear()
 
 
 # ---------------------------------------------------------------------------
@@ -192,6 +220,89 @@ def _validate_run_cmd_env(env: dict[str, str]) -> None:
             raise ValueError(f"Security violation: environment variable '{key}' is forbidden")
 
 
+# Characters that carry no meaning to /bin/sh: quoting, expansion, globbing, pipes and redirects are excluded.
+_PLAIN_COMMAND_RE = re.compile(r"[\w@%+=:,./ -]+")
+
+# Shell builtins behave differently from their PATH counterparts (e.g. dash's `echo -e`), so they stay in the shell.
+_SHELL_BUILTINS = frozenset(
+    {
+        ".",
+        ":",
+        "[",
+        "alias",
+        "bg",
+        "break",
+        "cd",
+        "command",
+        "continue",
+        "echo",
+        "eval",
+        "exec",
+        "exit",
+        "export",
+        "false",
+        "fg",
+        "getopts",
+        "hash",
+        "jobs",
+        "kill",
+        "local",
+        "printf",
+        "pwd",
+        "read",
+        "readonly",
+        "return",
+        "set",
+        "shift",
+        "test",
+        "times",
+        "trap",
+        "true",
+        "type",
+        "ulimit",
+        "umask",
+        "unalias",
+        "unset",
+        "wait",
+    }
+)
+
+
+def _split_plain_command(command: str) -> tuple[str, list[str]] | None:
+    """Return (executable, argv) for a command that needs no shell features, else None."""
+    if os.name != "posix" or not _PLAIN_COMMAND_RE.fullmatch(command):
+        return None
+    argv = command.split()
+    if not argv or "=" in argv[0] or argv[0] in _SHELL_BUILTINS:
+        return None
+    if "/" in argv[0]:
+        return (argv[0], argv) if os.path.isabs(argv[0]) else None
+    executable = shutil.which(argv[0])
+    if executable is None:
+        return None
+    # argv stays as typed so the program sees (and reports) the same argv[0] as under /bin/sh.
+    return executable, argv
+
+
+def _spawn_argv(
+    executable: str, argv: list[str], cwd: str, env: dict[str, str] | None
+) -> subprocess.CompletedProcess[str] | None:
+    """Run argv directly; returns None when only the shell can run it (ENOEXEC, e.g. no shebang line)."""
+    try:
+        return subprocess.run(argv, executable=executable, capture_output=True, text=True, timeout=30, cwd=cwd, env=env)
+    except OSError as exc:
+        if exc.errno == errno.ENOEXEC:
+            return None
+        # Mirror sh: 127 when the program cannot be found, 126 when it cannot be executed.
+        if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+            return subprocess.CompletedProcess(argv, 127, "", f"{argv[0]}: not found\n")
+        return subprocess.CompletedProcess(argv, 126, "", f"{argv[0]}: {exc.strerror or 'cannot execute'}\n")
+
+
+def _spawn_shell(command: str, cwd: str, env: dict[str, str] | None) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(command, shell=True, capture_output=True, text=True, timeout=30, cwd=cwd, env=env)
+
+
 def _run_cmd(command: str, cwd: str | None = None, env: dict[str, str] | None = None) -> str:
     """Run a shell command and return combined stdout+stderr."""
     work_dir = cwd or os.getcwd()
@@ -201,15 +312,12 @@ def _run_cmd(command: str, cwd: str | None = None, env: dict[str, str] | None =
             _validate_run_cmd_env(env)
             merged_env = os.environ.copy()
             merged_env.update(env)
-        result = subprocess.run(
-            command,
-            shell=True,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=work_dir,
-            env=merged_env,
-        )
+        # Plain "program arg ..." commands skip the intermediate /bin/sh process.
+        # An invalid cwd goes through the shell path so it still raises as before.
+        plain = _split_plain_command(command) if os.path.isdir(work_dir) else None
+        result = _spawn_argv(*plain, work_dir, merged_env) if plain is not None else None
+        if result is None:
+            result = _spawn_shell(command, work_dir, merged_env)
         parts: list[str] = []
         if result.stdout:
             parts.append(result.stdout)
@@ -370,9 +478,38 @@ _register(
 # ---------------------------------------------------------------------------
 
 
+def _inspect_accepts_on_progress(fn: Callable[..., Any]) -> bool:
+    try:
+        return "on_progress" in inspect.signature(fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+# Weak keys so the cache never keeps a caller's handler (and its closure) alive.
+_ACCEPTS_ON_PROGRESS: WeakKeyDictionary[Callable[..., Any], bool] = WeakKeyDictionary()
+
+
+def _accepts_on_progress(fn: Callable[..., Any]) -> bool:
+    """Whether an extra handler takes an on_progress kwarg; introspected once per handler."""
+    # Bound methods are rebuilt on every attribute access; key on the underlying function instead.
+    key = getattr(fn, "__func__", fn)
+    try:
+        return _ACCEPTS_ON_PROGRESS[key]
+    except KeyError:
+        pass
+    except TypeError:  # unhashable callable
+        return _inspect_accepts_on_progress(fn)
+    accepts = _inspect_accepts_on_progress(fn)
+    try:
+        _ACCEPTS_ON_PROGRESS[key] = accepts
+    except TypeError:  # not weak-referenceable
+        pass
+    return accepts
+
+
 def execute_tool(
     name: str,
-    arguments_json: str,
+    arguments_json: str | bytes,
     runtime_hooks: dict[str, Callable[..., Any]] | None = None,
     extra_handlers: dict[str, Callable[..., Any]] | None = None,
     on_progress: Callable[[str], None] | None = None,
@@ -381,6 +518,7 @@ def execute_tool(
     Look up a tool by name, parse its JSON arguments, and run it.
     Returns a string result (legacy) or a structured dict payload.
     extra_handlers: optional map of name -> handler for embedding-project tools.
+    arguments_json may be UTF-8 bytes, which are parsed without decoding to str first.
     """
     fn = _TOOL_IMPLS.get(name)
     source = "builtin"
@@ -394,17 +532,12 @@ def execute_tool(
         return f"Error: unknown tool '{name}'"
     try:
         args: dict[str, Any] = json.loads(arguments_json) if arguments_json else {}
-    except json.JSONDecodeError as exc:
+    except (json.JSONDecodeError, UnicodeDecodeError) as exc:
         return f"Error: failed to parse tool arguments: {exc}"
     if source == "extra":
         call_args = dict(args)
-        if on_progress is not None:
-            try:
-                signature = inspect.signature(fn)
-                if "on_progress" in signature.parameters:
-                    call_args["on_progress"] = on_progress
-            except (TypeError, ValueError):
-                pass
+        if on_progress is not None and _accepts_on_progress(fn):
+            call_args["on_progress"] = on_progress
         return fn(**call_args)
     try:
         return fn(**args)
@@ -419,31 +552,24 @@ def get_tool_definitions(
     include_orchestration: bool,
     extra_tools: list[dict[str, Any]] | None = None,
 ) -> list[dict[str, Any]]:
-    tools = list(BASE_TOOL_DEFINITIONS)
-    if include_orchestration:
-        tools.extend(ORCHESTRATION_TOOL_DEFINITIONS)
-    if extra_tools:
-        for t in extra_tools:
-            definition = t.get("definition") if isinstance(t, dict) else None
-            if isinstance(definition, dict) and definition.get("type") == "function" and "function" in definition:
-                tools.append(definition)
+    tools = list(_builtin_tool_definitions(include_orchestration))
+    tools.extend(_extra_tool_definitions(extra_tools))
     return tools
 
 
+def _extra_tool_definitions(extra_tools: list[dict[str, Any]] | None) -> Iterator[dict[str, Any]]:
+    for t in extra_tools or ():
+        definition = t.get("definition") if isinstance(t, dict) else None
+        if isinstance(definition, dict) and definition.get("type") == "function" and "function" in definition:
+            yield definition
+
+
 def get_tool_summaries(
     *,
     include_orchestration: bool,
     extra_tools: list[dict[str, Any]] | None = None,
 ) -> list[tuple[str, str]]:
     """Return a compact [(tool_name, description)] list for prompt building."""
-    summaries: list[tuple[str, str]] = []
-    for tool in get_tool_definitions(
-        include_orchestration=include_orchestration,
-        extra_tools=extra_tools,
-    ):
-        fn = tool.get("function", {})
-        name = fn.get("name")
-        description = fn.get("description")
-        if isinstance(name, str) and isinstance(description, str):
-            summaries.append((name, description))
+    summaries = list(_builtin_tool_summaries(include_orchestration))
+    summaries.extend(_summarize(_extra_tool_definitions(extra_tools)))
     return summaries
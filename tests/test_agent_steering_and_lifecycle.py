@@ -1,21 +1,56 @@
 from __future__ import annotations
 
 import json
+import os
 import tempfile
 import threading
+import time
 import unittest
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, NamedTuple
 from unittest.mock import patch
 
 from src.agent import Agent
 from src.providers.base import ProviderResponse, ToolCall
 
 
+class _FakeEvent:
+    """Lock-free stand-in for threading.Event in single-threaded cancellation tests."""
+
+    __slots__ = ("_set",)
+
+    def __init__(self) -> None:
+        self._set = False
+
+    def set(self) -> None:
+        self._set = True
+
+    def is_set(self) -> bool:
+        return self._set
+
+    def wait(self, timeout: float | None = None) -> bool:
+        # Nothing else can set the flag in a single-threaded test, so never block.
+        return self._set
+
+
+class CallRecord(NamedTuple):
+    model: str
+    messages: list[dict[str, Any]]
+    tools: list[dict[str, Any]]
+    session_id: str | None
+    thinking_level: str
+    api_key: str | None
+    # Snapshot of string contents sent in this call, for O(1) membership checks.
+    contents: frozenset[str]
+
+
 class FakeProvider:
     def __init__(self, responses: list[ProviderResponse]) -> None:
-        self._responses = responses[:]
-        self.calls: list[dict[str, Any]] = []
+        self._responses = deque(responses)
+        self.calls: list[CallRecord] = []
 
     def complete(
         self,
@@ -28,113 +63,186 @@ class FakeProvider:
         on_text_delta: Any = None,
         api_key: str | None = None,
     ) -> ProviderResponse:
-        self.calls.append(
-            {
-                "model": model,
-                "messages": messages,
-                "tools": tools,
-                "session_id": session_id,
-                "thinking_level": thinking_level,
-                "api_key": api_key,
-            }
-        )
+        contents = frozenset(m["content"] for m in messages if isinstance(m.get("content"), str))
+        self.calls.append(CallRecord(model, messages, tools, session_id, thinking_level, api_key, contents))
         if not self._responses:
             raise AssertionError("fake provider exhausted")
-        response = self._responses.pop(0)
+        response = self._responses.popleft()
         if on_text_delta is not None and response.text:
             on_text_delta(response.text)
         return response
 
 
+# Fake responses are read-only for the agent, so identical ones are built once and shared.
+@lru_cache(maxsize=None)
 def _assistant_with_tools(*calls: tuple[str, str, str]) -> ProviderResponse:
-    tool_calls = [ToolCall(id=call_id, name=name, arguments_json=args) for call_id, name, args in calls]
+    tool_calls: list[ToolCall] = []
+    message_tool_calls: list[dict[str, Any]] = []
+    for call_id, name, args in calls:
+        tool_calls.append(ToolCall(id=call_id, name=name, arguments_json=args))
+        message_tool_calls.append({"id": call_id, "type": "function", "function": {"name": name, "arguments": args}})
     return ProviderResponse(
-        assistant_message={
-            "role": "assistant",
-            "content": "",
-            "tool_calls": [
-                {
-                    "id": tc.id,
-                    "type": "function",
-                    "function": {"name": tc.name, "arguments": tc.arguments_json},
-                }
-                for tc in tool_calls
-            ],
-        },
+        assistant_message={"role": "assistant", "content": "", "tool_calls": message_tool_calls},
         tool_calls=tool_calls,
         text="",
     )
 
 
 def _assistant_text(text: str, usage: dict[str, int] | None = None) -> ProviderResponse:
+    return _cached_assistant_text(text, tuple(sorted(usage.items())) if usage is not None else None)
+
+
+@lru_cache(maxsize=None)
+def _cached_assistant_text(text: str, usage_items: tuple[tuple[str, int], ...] | None) -> ProviderResponse:
     return ProviderResponse(
         assistant_message={"role": "assistant", "content": text},
         tool_calls=[],
         text=text,
-        usage=usage,
+        usage=dict(usage_items) if usage_items is not None else None,
     )
 
 
+_STEP_TOOL_SCHEMA: dict[str, Any] = {
+    "type": "function",
+    "function": {
+        "name": "step",
+        "description": "Numbered no-op step used to drive multi-call turns",
+        "parameters": {
+            "type": "object",
+            "properties": {"n": {"type": "integer"}},
+            "required": ["n"],
+        },
+    },
+}
+
+# Two "step" calls in one assistant turn, used by the steer and abort scenarios.
+_TWO_STEP_CALLS = (("tc1", "step", '{"n":1}'), ("tc2", "step", '{"n":2}'))
+
+_PROGRESS_TOOL_SCHEMA: dict[str, Any] = {
+    "type": "function",
+    "function": {
+        "name": "progress_tool",
+        "description": "Progress-aware test tool",
+        "parameters": {
+            "type": "object",
+            "properties": {"value": {"type": "string"}},
+            "required": ["value"],
+        },
+    },
+}
+
+_FAILING_TOOL_SCHEMA: dict[str, Any] = {
+    "type": "function",
+    "function": {
+        "name": "failing_tool",
+        "description": "Always fails",
+        "parameters": {"type": "object", "properties": {}, "required": []},
+    },
+}
+
+
+def _progress_tool(value: str, on_progress: Any = None) -> str:
+    if on_progress is not None:
+        on_progress(f"start:{value}")
+        on_progress("finish")
+    return "ok"
+
+
+def _failing_tool() -> str:
+    raise RuntimeError("boom")
+
+
+_OK_RESPONSE = _assistant_text("ok")
+
+
+def _ok_provider() -> FakeProvider:
+    """Fresh single-reply provider; providers are stateful but the shared response is read-only."""
+    return FakeProvider([_OK_RESPONSE])
+
+
+@contextmanager
+def _swap_attr(obj: Any, name: str, value: Any) -> Iterator[None]:
+    """Temporarily replace obj.name with value (plain setattr/restore, no mock machinery)."""
+    original = getattr(obj, name)
+    setattr(obj, name, value)
+    try:
+        yield
+    finally:
+        setattr(obj, name, original)
+
+
+def _only(matches: Iterator[dict[str, Any]]) -> dict[str, Any]:
+    """Return the single item yielded by matches; fail if there are none or several."""
+    found = next(matches, None)
+    if found is None:
+        raise AssertionError("expected exactly one match, found none")
+    if next(matches, None) is not None:
+        raise AssertionError("expected exactly one match, found several")
+    return found
+
+
+def _contains_text(obj: Any, needle: str) -> bool:
+    """Return True if any string key or value nested in obj contains needle."""
+    if isinstance(obj, str):
+        return needle in obj
+    if isinstance(obj, dict):
+        return any(_contains_text(k, needle) or _contains_text(v, needle) for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return any(_contains_text(v, needle) for v in obj)
+    return False
+
+
 class AgentPiAlignmentTests(unittest.TestCase):
-    def _new_agent(
-        self,
-        provider: FakeProvider,
-        *,
-        cancel_event: threading.Event | None = None,
-        thinking_level: str | None = None,
-        on_event: Any = None,
-        transform_context: Any = None,
-        convert_to_llm: Any = None,
-        transform_messages_for_llm: Any = None,
-        extra_tools: Any = None,
-    ) -> Agent:
-        temp = tempfile.TemporaryDirectory()
-        self.addCleanup(temp.cleanup)
-        with patch.object(Agent, "_create_provider", return_value=provider):
+    @classmethod
+    def setUpClass(cls) -> None:
+        # One workspace/sessions dir for the class; each agent still gets its own session id.
+        cls._temp = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls._temp.cleanup)
+
+    def _new_agent(self, provider: FakeProvider, **overrides: Any) -> Agent:
+        """Build an Agent backed by provider; hook overrides left as None are not forwarded."""
+        hooks = {name: value for name, value in overrides.items() if value is not None}
+        with _swap_attr(Agent, "_create_provider", lambda _self, _name: provider):
             return Agent(
                 provider="openai",
                 model="gpt-4o",
-                workspace_dir=temp.name,
-                sessions_dir=temp.name,
-                cancel_event=cancel_event,
-                thinking_level=thinking_level,
-                on_event=on_event,
-                transform_context=transform_context,
-                convert_to_llm=convert_to_llm,
-                transform_messages_for_llm=transform_messages_for_llm,
-                extra_tools=extra_tools,
+                workspace_dir=self._temp.name,
+                sessions_dir=self._temp.name,
+                **hooks,
             )
 
-    def test_steer_interrupts_remaining_tool_calls(self) -> None:
+    def _run_steered_chat(self, steer_message: str, final_text: str, *, on_event: Any = None) -> tuple[Agent, str, int]:
+        """Run two queued tool calls, steering after the first; return (agent, result, tool invocations)."""
         provider = FakeProvider(
             [
-                _assistant_with_tools(
-                    ("tc1", "run_cmd", '{"command":"echo 1"}'), ("tc2", "run_cmd", '{"command":"echo 2"}')
-                ),
-                _assistant_text("done after steer"),
+                _assistant_with_tools(*_TWO_STEP_CALLS),
+                _assistant_text(final_text),
             ]
         )
-        agent = self._new_agent(provider)
         tool_invocations = {"count": 0}
 
-        def fake_execute_tool(*_: Any, **__: Any) -> str:
+        def step(n: int) -> str:
             tool_invocations["count"] += 1
             if tool_invocations["count"] == 1:
-                agent.steer("please pivot")
+                agent.steer(steer_message)
             return "ok"
 
-        with patch("src.agent.execute_tool", side_effect=fake_execute_tool):
-            result = agent.chat("start")
+        extra_tools = [{"name": "step", "definition": _STEP_TOOL_SCHEMA, "handler": step}]
+        agent = self._new_agent(provider, on_event=on_event, extra_tools=extra_tools)
+        result = agent.chat("start")
+        self.assertEqual(len(provider.calls), 2)
+        return agent, result, tool_invocations["count"]
+
+    def test_steer_interrupts_remaining_tool_calls(self) -> None:
+        agent, result, invocations = self._run_steered_chat("please pivot", "done after steer")
 
         self.assertEqual(result, "done after steer")
-        self.assertEqual(tool_invocations["count"], 1, "steer should skip remaining tool calls in turn")
-        self.assertEqual(len(provider.calls), 2)
-        self.assertTrue(any(msg.get("content") == "please pivot" for msg in agent.session.messages))
-        tc2_results = [
-            msg for msg in agent.session.messages if msg.get("tool_call_id") == "tc2" and msg.get("role") == "tool"
-        ]
-        self.assertEqual(len(tc2_results), 1)
-        self.assertIn("Skipped due to user interrupt.", tc2_results[0]["content"])
+        self.assertEqual(invocations, 1, "steer should skip remaining tool calls in turn")
+        # Session.messages is rebuilt from entries on each access; read it once.
+        messages = agent.session.messages
+        self.assertIn("please pivot", {msg.get("content") for msg in messages})
+        tc2_result = _only(msg for msg in messages if msg.get("tool_call_id") == "tc2" and msg.get("role") == "tool")
+        self.assertIn("Skipped due to user interrupt.", tc2_result["content"])
 
     def test_follow_up_injects_after_terminal_turn(self) -> None:
         provider = FakeProvider([_assistant_text("first"), _assistant_text("second")])
@@ -145,33 +253,53 @@ class AgentPiAlignmentTests(unittest.TestCase):
 
         self.assertEqual(result, "second")
         self.assertEqual(len(provider.calls), 2)
-        self.assertTrue(any(msg.get("content") == "run this afterwards" for msg in agent.session.messages))
+        # Follow-up lands after the first reply and before the second one.
+        self.assertEqual(agent.session.messages[-2], {"role": "user", "content": "run this afterwards"})
 
     def test_abort_checked_before_each_tool_execution(self) -> None:
-        cancel_event = threading.Event()
-        provider = FakeProvider(
-            [
-                _assistant_with_tools(
-                    ("tc1", "run_cmd", '{"command":"echo 1"}'), ("tc2", "run_cmd", '{"command":"echo 2"}')
-                )
-            ]
-        )
-        agent = self._new_agent(provider, cancel_event=cancel_event)
+        cancel_event = _FakeEvent()
+        provider = FakeProvider([_assistant_with_tools(*_TWO_STEP_CALLS)])
         tool_invocations = {"count": 0}
 
-        def fake_execute_tool(*_: Any, **__: Any) -> str:
+        def step(n: int) -> str:
             tool_invocations["count"] += 1
             cancel_event.set()
             return "ok"
 
-        with patch("src.agent.execute_tool", side_effect=fake_execute_tool):
-            result = agent.chat("start")
+        extra_tools = [{"name": "step", "definition": _STEP_TOOL_SCHEMA, "handler": step}]
+        agent = self._new_agent(provider, cancel_event=cancel_event, extra_tools=extra_tools)
+        result = agent.chat("start")
 
         self.assertEqual(result, "(agent stopped: cancelled)")
         self.assertEqual(tool_invocations["count"], 1)
 
+    def test_cancel_interrupts_retry_backoff(self) -> None:
+        cancel_event = threading.Event()
+        timer = threading.Timer(0.05, cancel_event.set)
+        self.addCleanup(timer.cancel)
+
+        class TransientFailureProvider:
+            calls = 0
+
+            def complete(self, **_: Any) -> ProviderResponse:
+                # Arm the cancel only once the first attempt has failed, so it lands in the retry backoff.
+                TransientFailureProvider.calls += 1
+                if TransientFailureProvider.calls == 1:
+                    timer.start()
+                raise RuntimeError("503 service unavailable")
+
+        agent = self._new_agent(TransientFailureProvider(), cancel_event=cancel_event)
+
+        started = time.perf_counter()
+        with patch.dict(os.environ, {"AGENT_MAX_RETRIES": "2", "AGENT_RETRY_BASE_SECONDS": "30"}):
+            with self.assertRaisesRegex(RuntimeError, "cancelled"):
+                agent.chat("start")
+
+        self.assertEqual(TransientFailureProvider.calls, 1)
+        self.assertLess(time.perf_counter() - started, 5.0, "backoff should end as soon as cancel_event is set")
+
     def test_thinking_level_session_id_and_transform_hook(self) -> None:
-        provider = FakeProvider([_assistant_text("ok")])
+        provider = _ok_provider()
         captured = {"transformed": False}
 
         def transform(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -186,13 +314,12 @@ class AgentPiAlignmentTests(unittest.TestCase):
 
         self.assertEqual(result, "ok")
         self.assertTrue(captured["transformed"])
-        self.assertEqual(provider.calls[0]["thinking_level"], "high")
-        self.assertEqual(provider.calls[0]["session_id"], agent.session.meta.session_id)
-        seen_marker = any(msg.get("content") == "transform-marker" for msg in provider.calls[0]["messages"])
-        self.assertTrue(seen_marker)
+        self.assertEqual(provider.calls[0].thinking_level, "high")
+        self.assertEqual(provider.calls[0].session_id, agent.session.meta.session_id)
+        self.assertEqual(provider.calls[0].messages[-1]["content"], "transform-marker")
 
     def test_transform_context_then_convert_to_llm_pipeline(self) -> None:
-        provider = FakeProvider([_assistant_text("ok")])
+        provider = _ok_provider()
         calls: list[str] = []
 
         def transform_context(messages: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -217,25 +344,22 @@ class AgentPiAlignmentTests(unittest.TestCase):
 
         self.assertEqual(result, "ok")
         self.assertEqual(calls, ["transform", "convert"])
-        sent_messages = provider.calls[0]["messages"]
-        self.assertTrue(any(msg.get("content") == "context-marker" for msg in sent_messages))
-        self.assertTrue(any(msg.get("content") == "convert-marker" for msg in sent_messages))
+        sent_messages = provider.calls[0].messages
+        self.assertEqual(sent_messages[-2]["content"], "context-marker")
+        self.assertEqual(sent_messages[-1]["content"], "convert-marker")
 
     def test_custom_entry_excluded_but_custom_message_included_in_llm_context(self) -> None:
-        provider = FakeProvider([_assistant_text("ok")])
+        provider = _ok_provider()
         agent = self._new_agent(provider)
         agent.session.add_custom_entry("memory", {"secret": "value"})
         agent.session.add_custom_message("inject", "custom-message-visible")
-        agent.store.save(agent.session)
 
         result = agent.chat("hello")
 
         self.assertEqual(result, "ok")
-        sent_messages = provider.calls[0]["messages"]
-        contents = [m.get("content") for m in sent_messages if isinstance(m, dict)]
-        self.assertIn("custom-message-visible", contents)
-        flattened = json.dumps(sent_messages, ensure_ascii=False)
-        self.assertNotIn('"secret": "value"', flattened)
+        sent_messages = provider.calls[0].messages
+        self.assertIn("custom-message-visible", provider.calls[0].contents)
+        self.assertFalse(_contains_text(sent_messages, "secret"))
 
     def test_on_event_emits_lifecycle_and_stream_updates(self) -> None:
         provider = FakeProvider([_assistant_text("streamed-text")])
@@ -245,14 +369,17 @@ class AgentPiAlignmentTests(unittest.TestCase):
         result = agent.chat_stream("hello", on_text_delta=lambda _: None)
 
         self.assertEqual(result, "streamed-text")
-        event_types = [e.get("type") for e in events]
-        self.assertIn("agent_start", event_types)
-        self.assertIn("turn_start", event_types)
-        self.assertIn("message_start", event_types)
-        self.assertIn("message_update", event_types)
-        self.assertIn("message_end", event_types)
-        self.assertIn("turn_end", event_types)
-        self.assertIn("agent_end", event_types)
+        seen = {e.get("type") for e in events}
+        required = {
+            "agent_start",
+            "turn_start",
+            "message_start",
+            "message_update",
+            "message_end",
+            "turn_end",
+            "agent_end",
+        }
+        self.assertTrue(required.issubset(seen), f"missing: {required - seen}")
         turn_end = next(e for e in events if e.get("type") == "turn_end")
         self.assertIn("tool_calls_count", turn_end)
         self.assertIn("assistant_message_preview", turn_end)
@@ -266,31 +393,7 @@ class AgentPiAlignmentTests(unittest.TestCase):
             ]
         )
         events: list[dict[str, Any]] = []
-
-        def progress_tool(value: str, on_progress: Any = None) -> str:
-            if on_progress is not None:
-                on_progress(f"start:{value}")
-                on_progress("finish")
-            return "ok"
-
-        extra_tools = [
-            {
-                "name": "progress_tool",
-                "definition": {
-                    "type": "function",
-                    "function": {
-                        "name": "progress_tool",
-                        "description": "Progress-aware test tool",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {"value": {"type": "string"}},
-                            "required": ["value"],
-                        },
-                    },
-                },
-                "handler": progress_tool,
-            }
-        ]
+        extra_tools = [{"name": "progress_tool", "definition": _PROGRESS_TOOL_SCHEMA, "handler": _progress_tool}]
         agent = self._new_agent(provider, on_event=events.append, extra_tools=extra_tools)
 
         result = agent.chat("run progress tool")
@@ -309,31 +412,16 @@ class AgentPiAlignmentTests(unittest.TestCase):
             ]
         )
 
-        def failing_tool() -> str:
-            raise RuntimeError("boom")
-
-        extra_tools = [
-            {
-                "name": "failing_tool",
-                "definition": {
-                    "type": "function",
-                    "function": {
-                        "name": "failing_tool",
-                        "description": "Always fails",
-                        "parameters": {"type": "object", "properties": {}, "required": []},
-                    },
-                },
-                "handler": failing_tool,
-            }
-        ]
+        extra_tools = [{"name": "failing_tool", "definition": _FAILING_TOOL_SCHEMA, "handler": _failing_tool}]
         agent = self._new_agent(provider, extra_tools=extra_tools)
 
         result = agent.chat("run failing tool")
 
         self.assertEqual(result, "handled")
-        tool_results = [m for m in agent.session.messages if m.get("role") == "tool" and m.get("tool_call_id") == "tc1"]
-        self.assertEqual(len(tool_results), 1)
-        self.assertIn("[Tool Error] failing_tool: boom", tool_results[0]["content"])
+        tool_result = _only(
+            m for m in agent.session.messages if m.get("role") == "tool" and m.get("tool_call_id") == "tc1"
+        )
+        self.assertIn("[Tool Error] failing_tool: boom", tool_result["content"])
 
     def test_continue_run_retries_without_new_user_message(self) -> None:
         provider = FakeProvider([_assistant_text("first"), _assistant_text("second")])
@@ -359,13 +447,11 @@ class AgentPiAlignmentTests(unittest.TestCase):
 
     def test_chat_with_one_tool_then_text_uses_real_execute_tool(self) -> None:
         """Full reactive loop: one tool call (read_file) then final text, no mock."""
-        temp = tempfile.TemporaryDirectory()
-        self.addCleanup(temp.cleanup)
-        workspace = Path(temp.name)
-        test_file = workspace / "hello.txt"
+        test_file = Path(self._temp.name) / "hello.txt"
         test_file.write_text("hello from file", encoding="utf-8")
+        self.addCleanup(test_file.unlink)
 
-        path_arg = json.dumps({"path": str(test_file)})
+        path_arg = json.dumps({"path": str(test_file)}, separators=(",", ":"))
         provider = FakeProvider(
             [
                 _assistant_with_tools(
@@ -374,34 +460,27 @@ class AgentPiAlignmentTests(unittest.TestCase):
                 _assistant_text("I read the file."),
             ]
         )
-        with patch.object(Agent, "_create_provider", return_value=provider):
-            agent = Agent(
-                provider="openai",
-                model="gpt-4o",
-                workspace_dir=str(workspace),
-                sessions_dir=str(workspace),
-            )
+        agent = self._new_agent(provider)
         result = agent.chat("read hello.txt for me")
 
         self.assertEqual(result, "I read the file.")
         self.assertEqual(len(provider.calls), 2)
         # Tool result should be in session
-        tool_results = [m for m in agent.session.messages if m.get("role") == "tool"]
-        self.assertEqual(len(tool_results), 1)
-        self.assertIn("hello from file", tool_results[0]["content"])
+        tool_result = _only(m for m in agent.session.messages if m.get("role") == "tool")
+        self.assertIn("hello from file", tool_result["content"])
 
     def test_get_api_key_is_forwarded_to_provider(self) -> None:
-        provider = FakeProvider([_assistant_text("ok")])
+        provider = _ok_provider()
         agent = self._new_agent(provider, extra_tools=None)
         agent.get_api_key = lambda provider_name: f"key-for-{provider_name}"
 
         result = agent.chat("hello")
 
         self.assertEqual(result, "ok")
-        self.assertEqual(provider.calls[0]["api_key"], "key-for-openai")
+        self.assertEqual(provider.calls[0].api_key, "key-for-openai")
 
     def test_before_turn_can_override_system_prompt(self) -> None:
-        provider = FakeProvider([_assistant_text("ok")])
+        provider = _ok_provider()
 
         def before_turn(_session_id: str, _round_no: int, _messages: list[dict[str, Any]], system_prompt: str):
             return (system_prompt + "\nTEST-HOOK-MARKER", None)
@@ -412,11 +491,37 @@ class AgentPiAlignmentTests(unittest.TestCase):
         result = agent.chat("hello")
 
         self.assertEqual(result, "ok")
-        first_messages = provider.calls[0]["messages"]
+        first_messages = provider.calls[0].messages
         system_message = first_messages[0]
         self.assertEqual(system_message.get("role"), "system")
         self.assertIn("TEST-HOOK-MARKER", system_message.get("content", ""))
 
+    def test_before_turn_prompt_override_is_scoped_to_its_round(self) -> None:
+        provider = FakeProvider([_assistant_with_tools(("tc1", "custom", "{}")), _assistant_text("done")])
+
+        def before_turn(_session_id: str, round_no: int, _messages: list[dict[str, Any]], system_prompt: str):
+            if round_no == 1:
+                return (system_prompt + "\nROUND-ONE-MARKER", None)
+            return None
+
+        agent = self._new_agent(provider, before_turn=before_turn)
+        with patch("src.agent.execute_tool", new=lambda *_, **__: "ok"):
+            result = agent.chat("start")
+
+        self.assertEqual(result, "done")
+        self.assertIn("ROUND-ONE-MARKER", provider.calls[0].messages[0]["content"])
+        self.assertNotIn("ROUND-ONE-MARKER", provider.calls[1].messages[0]["content"])
+        self.assertEqual(provider.calls[0].tools, provider.calls[1].tools)
+
+    def test_module_execute_tool_patch_applies_after_construction(self) -> None:
+        provider = FakeProvider([_assistant_with_tools(("tc1", "custom", "{}")), _assistant_text("done")])
+        agent = self._new_agent(provider)
+        with patch("src.agent.execute_tool", return_value="patched") as patched:
+            agent.chat("start")
+        patched.assert_called_once()
+        tool_message = _only(m for m in agent.session.messages if m.get("role") == "tool")
+        self.assertEqual(tool_message["content"], "patched")
+
     def test_usage_is_accumulated_into_session_meta(self) -> None:
         provider = FakeProvider(
             [
@@ -443,33 +548,42 @@ class AgentPiAlignmentTests(unittest.TestCase):
         self.assertEqual(agent.session.meta.usage_cache_read_tokens, 2)
         self.assertEqual(agent.session.meta.usage_cache_write_tokens, 1)
 
-    def test_steer_emits_skipped_tool_events(self) -> None:
+    def test_run_appends_steps_and_rewrites_session_file_once(self) -> None:
         provider = FakeProvider(
             [
-                _assistant_with_tools(
-                    ("tc1", "run_cmd", '{"command":"echo 1"}'),
-                    ("tc2", "run_cmd", '{"command":"echo 2"}'),
-                ),
-                _assistant_text("done"),
+                _assistant_with_tools(("tc1", "custom", "{}")),
+                _assistant_text("done", usage={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10}),
             ]
         )
-        events: list[dict[str, Any]] = []
-        agent = self._new_agent(provider, on_event=events.append)
-        invocations = {"count": 0}
-
-        def fake_execute_tool(*_: Any, **__: Any) -> str:
-            invocations["count"] += 1
-            if invocations["count"] == 1:
-                agent.steer("interrupt")
-            return "ok"
+        agent = self._new_agent(provider)
+        store = agent.store
+        with (
+            patch("src.agent.execute_tool", return_value="ok"),
+            patch.object(store, "save", wraps=store.save) as full_save,
+            patch.object(store, "save_pending", wraps=store.save_pending) as pending_save,
+        ):
+            self.assertEqual(agent.chat("start"), "done")
+
+        self.assertEqual(full_save.call_count, 1)
+        self.assertGreaterEqual(pending_save.call_count, 3)
+        reloaded = store.load_or_create(
+            session_id=agent.session.meta.session_id,
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir=self._temp.name,
+        )
+        self.assertEqual([m["role"] for m in reloaded.messages], ["user", "assistant", "tool", "assistant"])
+        self.assertEqual(reloaded.meta.usage_total_tokens, 10)
 
-        with patch("src.agent.execute_tool", side_effect=fake_execute_tool):
-            result = agent.chat("start")
+    def test_steer_emits_skipped_tool_events(self) -> None:
+        events: list[dict[str, Any]] = []
+        _agent, result, _invocations = self._run_steered_chat("interrupt", "done", on_event=events.append)
 
         self.assertEqual(result, "done")
-        skipped_end = [e for e in events if e.get("type") == "tool_execution_end" and e.get("tool_call_id") == "tc2"]
-        self.assertEqual(len(skipped_end), 1)
-        self.assertTrue(bool(skipped_end[0].get("skipped")))
+        skipped_end = _only(
+            e for e in events if e.get("type") == "tool_execution_end" and e.get("tool_call_id") == "tc2"
+        )
+        self.assertTrue(bool(skipped_end.get("skipped")))
 
     def test_structured_tool_result_details_emitted(self) -> None:
         provider = FakeProvider([_assistant_with_tools(("tc1", "custom", "{}")), _assistant_text("done")])
@@ -479,7 +593,7 @@ class AgentPiAlignmentTests(unittest.TestCase):
         def fake_execute_tool(*_: Any, **__: Any) -> dict[str, Any]:
             return {"text": "plain-text", "details": {"artifact": "x"}}
 
-        with patch("src.agent.execute_tool", side_effect=fake_execute_tool):
+        with patch("src.agent.execute_tool", new=fake_execute_tool):
             result = agent.chat("start")
 
         self.assertEqual(result, "done")
@@ -487,9 +601,8 @@ class AgentPiAlignmentTests(unittest.TestCase):
             m for m in agent.session.messages if m.get("role") == "tool" and m.get("tool_call_id") == "tc1"
         )
         self.assertEqual(tool_result.get("content"), "plain-text")
-        end_events = [e for e in events if e.get("type") == "tool_execution_end" and e.get("tool_call_id") == "tc1"]
-        self.assertEqual(len(end_events), 1)
-        self.assertEqual(end_events[0].get("details"), {"artifact": "x"})
+        end_event = _only(e for e in events if e.get("type") == "tool_execution_end" and e.get("tool_call_id") == "tc1")
+        self.assertEqual(end_event.get("details"), {"artifact": "x"})
 
 
 if __name__ == "__main__":
@@ -13,13 +13,31 @@ def _msg(role: str, content: str) -> dict[str, Any]:
 
 
 class ContextManagerTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._cm = ContextManager(mode="chars")
+
+    def _configure(
+        self,
+        *,
+        max_chars: int,
+        keep_last_messages: int,
+        compact_trigger_chars: int,
+        compact_keep_tail: int,
+    ) -> ContextManager:
+        """Set every chars-mode knob on the shared manager so no test depends on another's values."""
+        self._cm.max_chars = max_chars
+        self._cm.keep_last_messages = keep_last_messages
+        self._cm.compact_trigger_chars = compact_trigger_chars
+        self._cm.compact_keep_tail = compact_keep_tail
+        return self._cm
+
     def test_prepare_messages_under_cap_returns_all(self) -> None:
-        cm = ContextManager(
+        cm = self._configure(
             max_chars=10_000,
             keep_last_messages=30,
             compact_trigger_chars=20_000,
             compact_keep_tail=16,
-            mode="chars",
         )
         messages = [_msg("user", "a"), _msg("assistant", "b")]
         out, compacted = cm.prepare_messages(system_prompt="You are helpful.", history_messages=messages)
@@ -30,12 +48,11 @@ class ContextManagerTests(unittest.TestCase):
         self.assertEqual(len(out), 3)
 
     def test_prepare_messages_trims_to_keep_last(self) -> None:
-        cm = ContextManager(
+        cm = self._configure(
             max_chars=100_000,
             keep_last_messages=3,
             compact_trigger_chars=200_000,
             compact_keep_tail=16,
-            mode="chars",
         )
         messages = [_msg("user", f"m{i}") for i in range(10)]
         out, _ = cm.prepare_messages(system_prompt="Sys", history_messages=messages)
@@ -43,12 +60,11 @@ class ContextManagerTests(unittest.TestCase):
         self.assertEqual(len(out), 4)
 
     def test_prepare_messages_compacts_when_over_trigger(self) -> None:
-        cm = ContextManager(
+        cm = self._configure(
             max_chars=50_000,
             keep_last_messages=30,
             compact_trigger_chars=100,  # low trigger
             compact_keep_tail=5,
-            mode="chars",
         )
         messages = [_msg("user", "x" * 50) for _ in range(20)]
         out, compacted = cm.prepare_messages(system_prompt="Sys", history_messages=messages)
@@ -59,12 +75,11 @@ class ContextManagerTests(unittest.TestCase):
         self.assertIn("Compacted", first_history["content"])
 
     def test_prepare_messages_respects_char_cap(self) -> None:
-        cm = ContextManager(
+        cm = self._configure(
             max_chars=100,
             keep_last_messages=30,
             compact_trigger_chars=1000,
             compact_keep_tail=4,
-            mode="chars",
         )
         messages = [_msg("user", "a" * 80) for _ in range(10)]
         out, _ = cm.prepare_messages(system_prompt="S", history_messages=messages)
@@ -73,6 +88,18 @@ class ContextManagerTests(unittest.TestCase):
         total_chars = sum(len(m.get("content", "")) for m in out)
         self.assertLessEqual(total_chars, 500)
 
+    def test_prepare_messages_char_cap_drops_oldest_first(self) -> None:
+        cm = self._configure(
+            max_chars=250,
+            keep_last_messages=30,
+            compact_trigger_chars=10_000,
+            compact_keep_tail=4,
+        )
+        messages = [_msg("user", f"{i:02d}" + "a" * 48) for i in range(10)]
+        out, _ = cm.prepare_messages(system_prompt="S", history_messages=messages)
+        # 10 x 50 chars over a 250 cap: the newest five fit exactly
+        self.assertEqual([m["content"][:2] for m in out[1:]], ["05", "06", "07", "08", "09"])
+
     def test_from_env_returns_valid_manager(self) -> None:
         cm = ContextManager.from_env()
         self.assertIn(cm._mode, ("chars", "tokens"))
@@ -8,50 +8,40 @@ from src.prompt_builder import PromptBuilder
 
 
 class PromptBuilderTests(unittest.TestCase):
-    def test_build_contains_identity_section(self) -> None:
-        pb = PromptBuilder()
-        out = pb.build(
-            provider="openai",
-            model="gpt-4o",
-            workspace_dir="/tmp",
-            tool_summaries=[("read_file", "Read a file.")],
-        )
-        self.assertIn("## Identity", out)
-        self.assertIn("reactive coding agent", out)
-
-    def test_build_contains_tooling_section(self) -> None:
+    @classmethod
+    def setUpClass(cls) -> None:
+        # build() is pure for fixed inputs, so each variant is rendered once for the class.
         pb = PromptBuilder()
-        out = pb.build(
+        cls._prompt_openai = pb.build(
             provider="openai",
             model="gpt-4o",
             workspace_dir="/tmp",
             tool_summaries=[("read_file", "Read a file.")],
         )
-        self.assertIn("## Tooling", out)
-        self.assertIn("read_file", out)
-        self.assertIn("Read a file.", out)
-
-    def test_build_contains_workspace_and_runtime(self) -> None:
-        pb = PromptBuilder()
-        out = pb.build(
+        cls._prompt_anthropic = pb.build(
             provider="anthropic",
             model="claude-3-5-sonnet",
             workspace_dir="/tmp",
             tool_summaries=[],
         )
-        self.assertIn("## Workspace and Runtime", out)
-        self.assertIn("anthropic", out)
-        self.assertIn("claude-3-5-sonnet", out)
+
+    def test_build_contains_identity_section(self) -> None:
+        self.assertIn("## Identity", self._prompt_openai)
+        self.assertIn("reactive coding agent", self._prompt_openai)
+
+    def test_build_contains_tooling_section(self) -> None:
+        self.assertIn("## Tooling", self._prompt_openai)
+        self.assertIn("read_file", self._prompt_openai)
+        self.assertIn("Read a file.", self._prompt_openai)
+
+    def test_build_contains_workspace_and_runtime(self) -> None:
+        self.assertIn("## Workspace and Runtime", self._prompt_anthropic)
+        self.assertIn("anthropic", self._prompt_anthropic)
+        self.assertIn("claude-3-5-sonnet", self._prompt_anthropic)
 
     def test_build_contains_safety_section(self) -> None:
-        pb = PromptBuilder()
-        out = pb.build(
-            provider="openai",
-            model="gpt-4o",
-            workspace_dir="/tmp",
-            tool_summaries=[],
-        )
-        self.assertIn("## Safety", out)
+        self.assertIn("## Safety", self._prompt_openai)
+        self.assertIn("## Safety", self._prompt_anthropic)
 
 
 if __name__ == "__main__":
@@ -6,40 +6,36 @@ import json
 import tempfile
 import unittest
 from pathlib import Path
+from unittest.mock import patch
+from uuid import uuid4
 
 from src.session import Session, SessionMeta, utc_now_iso
 from src.session_store import SessionStore
 
+_FIXED_ISO = "2024-01-01T00:00:00+00:00"
+
 
 class SessionTests(unittest.TestCase):
-    def test_add_user_message(self) -> None:
-        meta = SessionMeta(
+    def setUp(self) -> None:
+        self.meta = SessionMeta(
             session_id="s1",
             provider="openai",
             model="gpt-4o",
             workspace_dir="/tmp",
             parent_session_id=None,
             subagent_depth=0,
-            created_at=utc_now_iso(),
-            updated_at=utc_now_iso(),
+            created_at=_FIXED_ISO,
+            updated_at=_FIXED_ISO,
         )
-        session = Session(meta=meta)
+
+    def test_add_user_message(self) -> None:
+        session = Session(meta=self.meta)
         session.add_user_message("hello")
         self.assertEqual(len(session), 1)
         self.assertEqual(session.messages[0], {"role": "user", "content": "hello"})
 
     def test_add_tool_result(self) -> None:
-        meta = SessionMeta(
-            session_id="s1",
-            provider="openai",
-            model="gpt-4o",
-            workspace_dir="/tmp",
-            parent_session_id=None,
-            subagent_depth=0,
-            created_at=utc_now_iso(),
-            updated_at=utc_now_iso(),
-        )
-        session = Session(meta=meta)
+        session = Session(meta=self.meta)
         session.add_tool_result("tc1", "result text")
         self.assertEqual(len(session), 1)
         self.assertEqual(session.messages[0]["role"], "tool")
@@ -47,34 +43,77 @@ class SessionTests(unittest.TestCase):
         self.assertEqual(session.messages[0]["content"], "result text")
 
     def test_reset_clears_messages(self) -> None:
-        meta = SessionMeta(
-            session_id="s1",
-            provider="openai",
-            model="gpt-4o",
-            workspace_dir="/tmp",
-            parent_session_id=None,
-            subagent_depth=0,
-            created_at=utc_now_iso(),
-            updated_at=utc_now_iso(),
-        )
-        session = Session(meta=meta)
+        session = Session(meta=self.meta)
         session.add_user_message("a")
         session.add_assistant_message({"role": "assistant", "content": "b"})
         session.reset()
         self.assertEqual(len(session), 0)
 
-    def test_accumulate_usage_updates_meta(self) -> None:
-        meta = SessionMeta(
-            session_id="s1",
-            provider="openai",
-            model="gpt-4o",
-            workspace_dir="/tmp",
-            parent_session_id=None,
-            subagent_depth=0,
-            created_at=utc_now_iso(),
-            updated_at=utc_now_iso(),
+    def test_prune_when_over_cap(self) -> None:
+        session = Session(meta=self.meta, max_total_bytes=4096)
+        for i in range(500):
+            session.add_user_message(f"message {i} " + "x" * 64)
+        self.assertLessEqual(session._total_bytes, 4096)
+        self.assertLess(len(session), 500)
+        self.assertEqual(session.messages[-1]["content"], "message 499 " + "x" * 64)
+
+    def test_constructor_does_not_prune_existing_entries(self) -> None:
+        entries = [
+            {"type": "message", "message": {"role": "user", "content": "x" * 100}, "timestamp": _FIXED_ISO}
+            for _ in range(20)
+        ]
+        session = Session(meta=self.meta, entries=entries, max_total_bytes=512)
+        self.assertEqual(len(session), 20)
+        session.add_user_message("new")
+        self.assertLess(len(session), 20)
+        self.assertEqual(session.messages[-1]["content"], "new")
+
+    def test_uncapped_session_does_not_measure_entries(self) -> None:
+        session = Session(meta=self.meta, max_total_bytes=None)
+        with patch("src.session._entry_bytes") as entry_bytes:
+            for i in range(10):
+                session.add_user_message(f"message {i}")
+        entry_bytes.assert_not_called()
+        self.assertEqual(len(session), 10)
+
+    def test_prune_does_not_leave_leading_tool_result(self) -> None:
+        session = Session(meta=self.meta, max_total_bytes=1024)
+        for i in range(50):
+            session.add_assistant_message(
+                {"role": "assistant", "content": "", "tool_calls": [{"id": f"c{i}", "type": "function"}]}
+            )
+            session.add_tool_result(f"c{i}", "y" * 64)
+        self.assertEqual(session.messages[0]["role"], "assistant")
+
+        # The newest assistant tool_calls group alone exceeds the cap: it is kept whole.
+        session = Session(meta=self.meta, max_total_bytes=300)
+        session.add_user_message("hi")
+        session.add_assistant_message(
+            {
+                "role": "assistant",
+                "content": "z" * 200,
+                "tool_calls": [{"id": "a", "type": "function"}, {"id": "b", "type": "function"}],
+            }
+        )
+        session.add_tool_result("a", "y" * 40)
+        session.add_tool_result("b", "y" * 10)
+        self.assertEqual([m["role"] for m in session.messages], ["assistant", "tool", "tool"])
+
+    def test_prune_drops_tool_results_past_interleaved_system_events(self) -> None:
+        session = Session(meta=self.meta, max_total_bytes=1 << 20)
+        session.add_assistant_message(
+            {"role": "assistant", "content": "x" * 200, "tool_calls": [{"id": "tc1", "type": "function"}]}
         )
-        session = Session(meta=meta)
+        session.add_system_event("Spawned subagent run=r1")
+        session.add_tool_result("tc1", "ok")
+        session.add_user_message("next")
+        # Dropping the tool_calls message alone would be enough to fit the cap.
+        session.max_total_bytes = session._total_bytes - 10
+        session.add_user_message("after")
+        self.assertEqual([m["role"] for m in session.messages], ["user", "user"])
+
+    def test_accumulate_usage_updates_meta(self) -> None:
+        session = Session(meta=self.meta)
         session.accumulate_usage(
             input_tokens=12,
             output_tokens=5,
@@ -90,10 +129,15 @@ class SessionTests(unittest.TestCase):
 
 
 class SessionStoreTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls._root.cleanup)
+
     def setUp(self) -> None:
-        self.temp = tempfile.TemporaryDirectory()
-        self.addCleanup(self.temp.cleanup)
-        self.store = SessionStore(sessions_dir=self.temp.name)
+        self.dir = Path(self._root.name) / uuid4().hex
+        self.dir.mkdir()
+        self.store = SessionStore(sessions_dir=str(self.dir))
 
     def test_resolve_session_id_uses_requested(self) -> None:
         sid = self.store.resolve_session_id("my-session")
@@ -114,7 +158,7 @@ class SessionStoreTests(unittest.TestCase):
         )
         self.assertEqual(session.meta.session_id, "new1")
         self.assertEqual(len(session), 0)
-        path = Path(self.temp.name) / "new1.jsonl"
+        path = self.dir / "new1.jsonl"
         self.assertTrue(path.is_file())
 
     def test_save_and_load_roundtrip(self) -> None:
@@ -127,6 +171,8 @@ class SessionStoreTests(unittest.TestCase):
         session.add_user_message("hi")
         session.add_assistant_message({"role": "assistant", "content": "hello"})
         self.store.save(session)
+        # Compact JSONL: header plus one line per message.
+        self.assertEqual((self.dir / "round.jsonl").read_bytes().count(b"\n"), 3)
 
         loaded = self.store.load_or_create(
             session_id="round",
@@ -138,6 +184,119 @@ class SessionStoreTests(unittest.TestCase):
         self.assertEqual(loaded.messages[0]["content"], "hi")
         self.assertEqual(loaded.messages[1]["content"], "hello")
 
+    def test_append_message_writes_only_new_record(self) -> None:
+        session = self.store.load_or_create(
+            session_id="append",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        path = self.dir / "append.jsonl"
+        for i in range(100):
+            before = path.read_bytes()
+            self.store.append_message(session, {"role": "user", "content": f"message {i}"})
+            after = path.read_bytes()
+            # Existing bytes are untouched; exactly one new line was written.
+            self.assertTrue(after.startswith(before))
+            added = after[len(before) :]
+            self.assertEqual(added.count(b"\n"), 1)
+            self.assertEqual(json.loads(added)["message"]["content"], f"message {i}")
+
+        loaded = self.store.load_or_create(
+            session_id="append",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        self.assertEqual(len(loaded), 100)
+        self.assertEqual(loaded.messages[-1], {"role": "user", "content": "message 99"})
+
+    def test_load_10k_messages(self) -> None:
+        session = self.store.load_or_create(
+            session_id="big",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        for i in range(10_000):
+            session.add_user_message(f"message {i}\u2028")
+        self.store.save_pending(session)
+
+        loaded = self.store.load_or_create(
+            session_id="big",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        self.assertEqual(len(loaded), 10_000)
+        self.assertEqual(loaded.messages[0]["content"], "message 0\u2028")
+        self.assertEqual(loaded.messages[-1]["content"], "message 9999\u2028")
+
+    def test_load_does_not_reencode_entries_to_size_them(self) -> None:
+        session = self.store.load_or_create(
+            session_id="sized",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        for i in range(50):
+            session.add_user_message(f"message {i}")
+        self.store.save(session)
+
+        with patch("src.session._entry_bytes") as entry_bytes:
+            loaded = self.store.load_or_create(
+                session_id="sized",
+                provider="openai",
+                model="gpt-4o",
+                workspace_dir="/workspace",
+            )
+        entry_bytes.assert_not_called()
+        self.assertEqual(loaded._total_bytes, session._total_bytes)
+
+    def test_save_pending_flushes_tail_with_one_fsync(self) -> None:
+        session = self.store.load_or_create(
+            session_id="pending",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        for i in range(100):
+            session.add_user_message(f"message {i}")
+        with patch("src.session_store.os.fsync") as fsync:
+            self.store.save_pending(session)
+            self.store.save_pending(session)  # nothing left to flush
+        self.assertEqual(fsync.call_count, 1)
+
+        loaded = self.store.load_or_create(
+            session_id="pending",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        self.assertEqual(len(loaded), 100)
+        self.assertEqual(loaded.messages[-1], {"role": "user", "content": "message 99"})
+
+    def test_save_pending_after_reset_rewrites_file(self) -> None:
+        session = self.store.load_or_create(
+            session_id="pending-reset",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        session.add_user_message("old")
+        self.store.save_pending(session)
+        session.reset()
+        session.add_user_message("new")
+        self.store.save_pending(session)
+
+        loaded = self.store.load_or_create(
+            session_id="pending-reset",
+            provider="openai",
+            model="gpt-4o",
+            workspace_dir="/workspace",
+        )
+        self.assertEqual(loaded.messages, [{"role": "user", "content": "new"}])
+
     def test_save_and_load_usage_fields(self) -> None:
         session = self.store.load_or_create(
             session_id="usage",
@@ -167,7 +326,7 @@ class SessionStoreTests(unittest.TestCase):
         self.assertEqual(loaded.meta.usage_cache_write_tokens, 3)
 
     def test_load_legacy_session_header_defaults_usage_to_zero(self) -> None:
-        path = Path(self.temp.name) / "legacy.jsonl"
+        path = self.dir / "legacy.jsonl"
         path.write_text(
             "\n".join(
                 [
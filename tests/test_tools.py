@@ -2,20 +2,30 @@
 
 from __future__ import annotations
 
+import gc
 import json
+import os
+import subprocess
 import sys
 import tempfile
 import unittest
+import weakref
 from pathlib import Path
+from unittest.mock import patch
+from uuid import uuid4
 
 from src.tools import execute_tool, get_tool_definitions, get_tool_summaries
 
 
 class ExecuteToolTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._root = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(cls._root.cleanup)
+
     def setUp(self) -> None:
-        self.temp = tempfile.TemporaryDirectory()
-        self.addCleanup(self.temp.cleanup)
-        self.workspace = Path(self.temp.name)
+        self.workspace = Path(self._root.name) / uuid4().hex
+        self.workspace.mkdir()
 
     def test_read_file(self) -> None:
         path = self.workspace / "hello.txt"
@@ -23,6 +33,14 @@ class ExecuteToolTests(unittest.TestCase):
         result = execute_tool("read_file", json.dumps({"path": str(path)}))
         self.assertIn("hello world", result)
 
+    def test_read_file_large_payload(self) -> None:
+        path = self.workspace / "large.txt"
+        size = 8 * 1024 * 1024
+        path.write_bytes(b"abcdefg\n" * (size // 8))
+        result = execute_tool("read_file", json.dumps({"path": str(path)}))
+        self.assertEqual(len(result), size)
+        self.assertTrue(result.endswith("abcdefg\n"))
+
     def test_write_file(self) -> None:
         path = self.workspace / "out.txt"
         result = execute_tool("write_file", json.dumps({"path": str(path), "content": "written"}))
@@ -43,6 +61,58 @@ class ExecuteToolTests(unittest.TestCase):
         )
         self.assertIn("ok", result)
 
+    @unittest.skipUnless(os.name == "posix", "argv fast path is posix-only")
+    def test_run_cmd_no_shell(self) -> None:
+        with patch("src.tools.subprocess.run", wraps=subprocess.run) as run:
+            result = execute_tool("run_cmd", json.dumps({"command": "/bin/echo ok", "cwd": str(self.workspace)}))
+            self.assertEqual(run.call_args.args[0], ["/bin/echo", "ok"])
+            self.assertNotIn("shell", run.call_args.kwargs)
+            self.assertIn("ok", result)
+            self.assertIn("[exit code: 0]", result)
+
+            piped = execute_tool("run_cmd", json.dumps({"command": "echo abc | tr a x", "cwd": str(self.workspace)}))
+            self.assertTrue(run.call_args.kwargs["shell"])
+            self.assertIn("xbc", piped)
+
+            execute_tool("run_cmd", json.dumps({"command": "echo -e hi", "cwd": str(self.workspace)}))
+            self.assertTrue(run.call_args.kwargs["shell"])
+
+    @unittest.skipUnless(os.name == "posix", "argv fast path is posix-only")
+    def test_run_cmd_script_without_shebang_falls_back_to_shell(self) -> None:
+        script = self.workspace / "noshebang"
+        script.write_text("echo from-script\n", encoding="utf-8")
+        script.chmod(0o755)
+        result = execute_tool("run_cmd", json.dumps({"command": str(script), "cwd": str(self.workspace)}))
+        self.assertIn("from-script", result)
+        self.assertIn("[exit code: 0]", result)
+
+    @unittest.skipUnless(os.name == "posix", "argv fast path is posix-only")
+    def test_run_cmd_missing_absolute_program_reports_exit_127(self) -> None:
+        missing = str(self.workspace / "missing" / "prog")
+        result = execute_tool("run_cmd", json.dumps({"command": f"{missing} arg", "cwd": str(self.workspace)}))
+        self.assertIn("not found", result)
+        self.assertTrue(result.endswith("[exit code: 127]"))
+
+        not_a_dir = self.workspace / "plain.txt"
+        not_a_dir.write_text("", encoding="utf-8")
+        result = execute_tool("run_cmd", json.dumps({"command": f"{not_a_dir}/prog arg", "cwd": str(self.workspace)}))
+        self.assertIn("not found", result)
+        self.assertTrue(result.endswith("[exit code: 127]"))
+
+    @unittest.skipUnless(os.name == "posix", "argv fast path is posix-only")
+    def test_run_cmd_directory_as_program_reports_exit_126(self) -> None:
+        result = execute_tool("run_cmd", json.dumps({"command": str(self.workspace), "cwd": str(self.workspace)}))
+        self.assertTrue(result.endswith("[exit code: 126]"))
+
+    @unittest.skipUnless(os.name == "posix", "argv fast path is posix-only")
+    def test_run_cmd_keeps_typed_program_name(self) -> None:
+        missing = str(self.workspace / "nonexistent")
+        with patch("src.tools.subprocess.run", wraps=subprocess.run) as run:
+            result = execute_tool("run_cmd", json.dumps({"command": f"ls {missing}", "cwd": str(self.workspace)}))
+        self.assertEqual(run.call_args.args[0], ["ls", missing])
+        self.assertNotIn("shell", run.call_args.kwargs)
+        self.assertIn("[stderr]\nls: ", result)
+
     def test_run_cmd_env_safe_allows_basic_env(self) -> None:
         result = execute_tool(
             "run_cmd",
@@ -93,6 +163,13 @@ class ExecuteToolTests(unittest.TestCase):
         result = execute_tool("read_file", "not json")
         self.assertTrue(result.startswith("Error:"))
 
+    def test_execute_tool_accepts_bytes_arguments(self) -> None:
+        path = self.workspace / "bytes.txt"
+        path.write_text("from bytes", encoding="utf-8")
+        result = execute_tool("read_file", json.dumps({"path": str(path)}).encode("utf-8"))
+        self.assertEqual(result, "from bytes")
+        self.assertTrue(execute_tool("read_file", b"\xff").startswith("Error: failed to parse"))
+
     def test_extra_handler_accepts_on_progress(self) -> None:
         updates: list[str] = []
 
@@ -110,6 +187,33 @@ class ExecuteToolTests(unittest.TestCase):
         self.assertEqual(result, "ok")
         self.assertEqual(updates, ["update:v"])
 
+    def test_extra_handler_without_on_progress_is_not_passed_it(self) -> None:
+        class UnhashableHandler:
+            __hash__ = None  # type: ignore[assignment]
+
+            def __call__(self, value: str) -> str:
+                return f"got:{value}"
+
+        for handler in (lambda value: f"got:{value}", UnhashableHandler()):
+            for _ in range(2):
+                result = execute_tool(
+                    "plain_custom",
+                    json.dumps({"value": "v"}),
+                    extra_handlers={"plain_custom": handler},
+                    on_progress=lambda _update: None,
+                )
+                self.assertEqual(result, "got:v")
+
+    def test_extra_handler_is_not_kept_alive_by_execute_tool(self) -> None:
+        def handler(on_progress=None) -> str:
+            return "ok"
+
+        execute_tool("weak_custom", "{}", extra_handlers={"weak_custom": handler}, on_progress=lambda _update: None)
+        ref = weakref.ref(handler)
+        del handler
+        gc.collect()
+        self.assertIsNone(ref())
+
     def test_extra_handler_exception_propagates(self) -> None:
         def failing_handler() -> str:
             raise RuntimeError("boom")
@@ -149,6 +253,12 @@ class GetToolDefinitionsTests(unittest.TestCase):
         self.assertIn("sessions_spawn", names)
         self.assertIn("subagents", names)
 
+    def test_returned_list_is_independent_of_cache(self) -> None:
+        first = get_tool_definitions(include_orchestration=False)
+        first.append({"type": "function", "function": {"name": "scratch"}})
+        second = get_tool_definitions(include_orchestration=False)
+        self.assertNotIn("scratch", [t["function"]["name"] for t in second])
+
 
 class GetToolSummariesTests(unittest.TestCase):
     def test_returns_list_of_tuples(self) -> None:
@@ -160,6 +270,13 @@ class GetToolSummariesTests(unittest.TestCase):
             self.assertIsInstance(item[0], str)
             self.assertIsInstance(item[1], str)
 
+    def test_appends_extra_tool_summaries(self) -> None:
+        extra = {"definition": {"type": "function", "function": {"name": "step", "description": "One step."}}}
+        summaries = get_tool_summaries(include_orchestration=True, extra_tools=[extra])
+        self.assertEqual(summaries[-1], ("step", "One step."))
+        self.assertIn("sessions_spawn", [name for name, _ in summaries])
+        self.assertNotIn("step", [name for name, _ in get_tool_summaries(include_orchestration=True)])
+
 
 if __name__ == "__main__":
     unittest.main()